@@ -6,11 +6,13 @@ Created on Oct 11, 2016
 View the full repository here https://github.com/car-chase/amoebots
 '''
 
-from time import sleep
+from queue import Empty, Full
 import time
 import math
-import jsonpickle
+import json
+from multiprocessing import shared_memory
 from pathfinder import Pathfinder
+from world_model import Arena
 from message import Message
 
 class AiLevel:
@@ -19,10 +21,10 @@ class AiLevel:
     generates the commands for the robot to execute.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         keep_running (bool): Boolean that keeps the main event loop running.
         connections (dict): A dictionary that maps the program levels to their respective queues.
     """
@@ -33,6 +35,11 @@ class AiLevel:
         self.connections = {}
         self.world_model = None
 
+        # Shared-memory attachment to the movement level's world grid; opened
+        # on the first plan request and reused afterwards
+        self.attached_shm = None
+        self.attached_shm_name = None
+
     def ai_level_main(self, ai_input, mov_input, main_input):
         """
         The main event loop of the movement level.  The loop checks for messages to the level,
@@ -52,13 +59,23 @@ class AiLevel:
             'message': 'AI_LEVEL is running'
         }))
 
+        # Bind hot-loop values to locals once; attribute lookups inside the
+        # loop are pure overhead
+        ai_queue = self.connections["AI_LEVEL"][1]
+        interval = self.options.AI_LOOP_SLEEP_INTERVAL
+
         # Infinite loop to keep the process running
         while self.keep_running:
             try:
-                # Get items from input queue until it is not empty
-                while not self.connections["AI_LEVEL"][1].empty():
+                # Block until a message arrives; the sleep interval is kept as
+                # an idle backstop
+                try:
+                    message = ai_queue.get(timeout=interval)
+                except Empty:
+                    message = None
 
-                    message = self.connections["AI_LEVEL"][1].get()
+                # Process messages until the queue is drained
+                while message is not None:
 
                     # make sure the message is a Message object
                     if isinstance(message, Message):
@@ -71,14 +88,17 @@ class AiLevel:
                         if message.destination != "AI_LEVEL":
                             relay_to = self.connections[message.destination][1]
 
-                            relay_to.put(message)
+                            self.put_bounded(relay_to, message)
 
-                        elif self.options['DUMP_MSGS_TO_MAIN']:
+                        elif self.options.DUMP_MSGS_TO_MAIN:
                             main_input.put(message)
 
-                # Do rest of stuff
+                    try:
+                        message = ai_queue.get_nowait()
+                    except Empty:
+                        message = None
 
-                sleep(self.options["AI_LOOP_SLEEP_INTERVAL"])
+                # Do rest of stuff
 
             except Exception as err:
                 # Catch all exceptions and log them.
@@ -87,7 +107,7 @@ class AiLevel:
                 }))
 
                 # Raise the exception again so it isn't lost.
-                if self.options["RAISE_ERRORS_AFTER_CATCH"]:
+                if self.options.RAISE_ERRORS_AFTER_CATCH:
                     raise
 
     def process_command(self, message):
@@ -100,8 +120,12 @@ class AiLevel:
         """
 
         if message.data['directive'] == 'generate-plan':
-            # Parse out the world model
-            world = jsonpickle.decode(message.data['args'])
+            # Read the world model out of shared memory (or fall back to an
+            # inline payload)
+            if 'shm_name' in message.data:
+                world = self.read_shared_world(message.data)
+            else:
+                world = Arena.from_plan_payload(json.loads(message.data['args']))
 
             self.connections["MAIN_LEVEL"][1].put(Message('AI_LEVEL', 'MAIN_LEVEL', 'info', {
                 'message':"Path requested for world:\n" + world.to_string()
@@ -137,9 +161,56 @@ class AiLevel:
                 'message': 'Shutting down AI_LEVEL'
             }))
 
+            # Detach from the shared world state
+            if self.attached_shm is not None:
+                self.attached_shm.close()
+                self.attached_shm = None
+
             # End the com_level
             self.keep_running = False
 
+    def put_bounded(self, queue_obj, message):
+        """
+        Puts a message on a bounded inter-level queue, waiting briefly if it is full.  If
+        the consumer still hasn't drained the queue after the wait, the message is dropped
+        and the drop is reported to the main level if its queue has room, so one slow
+        consumer can't stall the event loop.
+
+        Args:
+            queue_obj (Queue): The queue to put the message on.
+            message (Message): The message to send.
+        """
+
+        try:
+            queue_obj.put(message, timeout=0.1)
+        except Full:
+            try:
+                self.connections["MAIN_LEVEL"][1].put_nowait(
+                    Message('AI_LEVEL', 'MAIN_LEVEL', 'error', {
+                        'message': f'Dropped a message to {message.destination}; '
+                                   'the queue is full'
+                    }))
+            except Full:
+                pass
+
+    def read_shared_world(self, data):
+        """
+        Rebuilds the world model from the movement level's shared-memory grid.  The block is
+        attached on first use and kept open for later plan requests.
+
+        Args:
+            data (dict): The plan request data carrying the shm name and arena dimensions.
+        """
+
+        if self.attached_shm_name != data['shm_name']:
+            if self.attached_shm is not None:
+                self.attached_shm.close()
+            self.attached_shm = shared_memory.SharedMemory(name=data['shm_name'])
+            self.attached_shm_name = data['shm_name']
+
+        return Arena.from_shared_buffer(self.attached_shm.buf,
+                                        data['arena_size'], data['arena_size_cm'])
+
     def robot_goal_assignment(self, world_grid):
         """
         Assigns robots to the goal that is nearest to them.
@@ -151,8 +222,8 @@ class AiLevel:
         robot_and_position = [] # [(robot_number, (robot_x, robot_y))]
         robot_and_goal = [] # [(robot_number, (goal_x, goal_y))]
 
-        for row in range(self.options["ARENA_SIZE"]):
-            for col in range(self.options["ARENA_SIZE"]):
+        for row in range(self.options.ARENA_SIZE):
+            for col in range(self.options.ARENA_SIZE):
                 if world_grid[row][col].goal is True:
                     goal_positions.append(world_grid[row][col].position)
                 if world_grid[row][col].occupied is not None:
@@ -201,7 +272,7 @@ class AiLevel:
         for index, entry in enumerate(robot_and_goal):
             robot_goals.append(entry)
             # Process if it has hit the necesssary iterations or if it is the last robot
-            if(len(robot_goals) % self.options["ROBOTS_PLANNED_PER_ITERATION"] == 0
+            if(len(robot_goals) % self.options.ROBOTS_PLANNED_PER_ITERATION == 0
                or index == len(robot_and_goal) - 1):
                 pathfinder = Pathfinder(self.options, world.grid, robot_goals)
                 robot_goals = []
@@ -7,10 +7,12 @@ View the full repository here https://github.com/car-chase/amoebots
 '''
 
 from time import sleep
+from queue import Empty
 import sys
 import socket
 import json
 from serial import Serial
+from helpers import set_low_latency
 from message import Message
 
 class BotProcess:
@@ -19,7 +21,7 @@ class BotProcess:
 
     Args:
         address (str): The COM/TCP address that the robot is using.
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
         bot_input (Queue): The queue for receiving messages in the bot process.
@@ -35,7 +37,7 @@ class BotProcess:
         self.keep_running = True
 
         # Set the TCP socket timeout
-        socket.setdefaulttimeout(self.options["TCP_PORT_TIMEOUT"])
+        socket.setdefaulttimeout(self.options.TCP_PORT_TIMEOUT)
 
     def bot_process_main(self, bot_input, com_input):
         """
@@ -80,7 +82,7 @@ class BotProcess:
             }))
 
             # Raise the exception again so it isn't lost.
-            if self.options["RAISE_ERRORS_AFTER_CATCH"]:
+            if self.options.RAISE_ERRORS_AFTER_CATCH:
                 raise
 
         return 0
@@ -89,8 +91,11 @@ class BotProcess:
         """
         The main event loop of a COM port robot.
         """
-        with Serial(self.address, self.options["BAUD"],
-                    timeout=self.options["COM_PORT_TIMEOUT"]) as connection:
+        with Serial(self.address, self.options.BAUD,
+                    timeout=self.options.COM_PORT_TIMEOUT) as connection:
+
+            # Cut the USB-serial buffering delay for the life of the connection
+            set_low_latency(connection)
 
             self.com_input.put(Message(self.address, 'MAIN_LEVEL', 'info', {
                 'message': 'Connected to robot'
@@ -101,13 +106,16 @@ class BotProcess:
             while connection.inWaiting() > 0:
                 response = connection.read(connection.inWaiting())
 
+            # bind hot-loop values to locals once; attribute lookups inside
+            # the loop are pure overhead
+            interval = self.options.BOT_LOOP_SLEEP_INTERVAL
+            intervals_per_ping = self.options.BOT_SLEEP_INTERVALS_PER_PING
+
             while self.keep_running:
-                self.wait_for_commands(self.options["BOT_LOOP_SLEEP_INTERVAL"],
-                                       self.options["BOT_SLEEP_INTERVALS_PER_PING"])
+                message = self.wait_for_commands(interval, intervals_per_ping)
 
-                # there is data in the queue
-                while not self.bot_input.empty():
-                    message = self.bot_input.get()
+                # process commands until the queue is drained
+                while message is not None:
 
                     # make sure the message is a list object
                     if isinstance(message, Message):
@@ -120,7 +128,7 @@ class BotProcess:
 
                             mov_str = str(command) + " " + str(magnitude)
 
-                            if self.options["SHOW_BOT_COMMUNICATIONS"]:
+                            if self.options.SHOW_BOT_COMMUNICATIONS:
                                 self.com_input.put(Message(self.address, 'MAIN_LEVEL', 'info', {
                                     'message': 'Given command: ' + mov_str
                                 }))
@@ -161,6 +169,11 @@ class BotProcess:
                             self.keep_running = False
                             sys.exit()
 
+                    try:
+                        message = self.bot_input.get_nowait()
+                    except Empty:
+                        message = None
+
     def tcp_process(self):
         """
         The main event loop of a COM port robot.
@@ -177,13 +190,16 @@ class BotProcess:
             sleep(2)
             connection.connect((connection_data['ip'], int(self.address[4:])))
 
+            # bind hot-loop values to locals once; attribute lookups inside
+            # the loop are pure overhead
+            interval = self.options.BOT_LOOP_SLEEP_INTERVAL
+            intervals_per_ping = self.options.BOT_SLEEP_INTERVALS_PER_PING
+
             while self.keep_running:
-                self.wait_for_commands(self.options["BOT_LOOP_SLEEP_INTERVAL"],
-                                       self.options["BOT_SLEEP_INTERVALS_PER_PING"])
+                message = self.wait_for_commands(interval, intervals_per_ping)
 
-                # there is data in the queue
-                while not self.bot_input.empty():
-                    message = self.bot_input.get()
+                # process commands until the queue is drained
+                while message is not None:
 
                     # check if the message is a movement command
                     if message.category == 'movement':
@@ -193,7 +209,7 @@ class BotProcess:
 
                         mov_str = str(command) + " " + str(magnitude)
 
-                        if self.options["SHOW_BOT_COMMUNICATIONS"]:
+                        if self.options.SHOW_BOT_COMMUNICATIONS:
                             self.com_input.put(Message(self.address, 'MAIN_LEVEL', 'info', {
                                 'message': 'Given command: ' + mov_str
                             }))
@@ -221,26 +237,29 @@ class BotProcess:
                         self.keep_running = False
                         sys.exit()
 
+                    try:
+                        message = self.bot_input.get_nowait()
+                    except Empty:
+                        message = None
+
     def wait_for_commands(self, timeout, intervals_per_ping):
         """
-        Loops forever until a command is put in the bot_input.  Pings the robot periodically to
-        ensure the connection is still active.
+        Blocks until a command is put in the bot_input and returns it.  If the connection is
+        idle for the full ping period, a ping command is returned instead so the connection is
+        still verified periodically.
 
         Args:
-            timeout (float): The time in seconds that the loop should wait before checking for data.
+            timeout (float): The time in seconds of a single wait interval.
             intervals_per_ping (int): Number of intervals that should run before a ping is sent.
         """
 
-        interval = 0
-
-        # wait until a command has been issued
-        while self.bot_input.empty():
-            sleep(timeout)
-            interval = interval + 1
-            if interval >= intervals_per_ping:
-                self.bot_input.put(Message(self.address, self.address, 'movement', {
-                    'command': 99, # Ping command
-                    'magnitude': 0,
-                    'message': 'Pinging Robot'
-                }))
-                interval = 0
+        try:
+            # a single blocking wait covering the whole ping period replaces
+            # the old fixed-interval polling loop
+            return self.bot_input.get(timeout=timeout * intervals_per_ping)
+        except Empty:
+            return Message(self.address, self.address, 'movement', {
+                'command': 99, # Ping command
+                'magnitude': 0,
+                'message': 'Pinging Robot'
+            })
@@ -15,7 +15,7 @@ class CameraProcess:
     Facilitates communication with the arena camera.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
         cam_input (Queue): The queue for receiving messages in the camera process.
@@ -28,7 +28,7 @@ class CameraProcess:
         #options as defined in main.py
         self.options = options
         #stores the number of robots available
-        self.length = len(self.options['COLORS'])
+        self.length = len(self.options.COLORS)
         #blob detection
         self.detector = None
         #dictionary that holds the data to be sent back to the movement_level
@@ -36,11 +36,11 @@ class CameraProcess:
         #value to scale the pixel data properly
         self.scaler = 0
         #distance between orange squares
-        self.arena_size = self.options['ARENA_SIZE_CM']
+        self.arena_size = self.options.ARENA_SIZE_CM
         #temporary storage for recieved messages
         self.movement_message = {}
         #number of iterations the camera should do before responding with data
-        self.camera_iterations = self.options['CAMERA_ITERATIONS']
+        self.camera_iterations = self.options.CAMERA_ITERATIONS
         #stores the number of iterations completed
         self.iterations = 0
         #flag that is set to True when a message is recieved and false when a response has been sent
@@ -340,7 +340,7 @@ class CameraProcess:
 
         self.cam_input = cam_input
         self.com_input = com_input
-        self.capture = cv2.VideoCapture(self.options['CAMERA_ID'])
+        self.capture = cv2.VideoCapture(self.options.CAMERA_ID)
         self.detector = self.blob_detector()
 
         self.com_input.put(Message('CAM_PROCESS', 'MAIN_LEVEL', 'info', {
@@ -393,8 +393,8 @@ class CameraProcess:
             hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
 
             for index in range(self.length):
-                mask = cv2.inRange(hsv, tuple(self.options['MIN_COLORS'][index]),
-                                   tuple(self.options['MAX_COLORS'][index]))
+                mask = cv2.inRange(hsv, self.options.MIN_COLORS[index],
+                                   self.options.MAX_COLORS[index])
                 cv2.bitwise_and(img, img, mask=mask)
                 keypoints = self.detector.detect(mask)
 
@@ -413,7 +413,7 @@ class CameraProcess:
                     #if there are 3 keypoints then calculate the location
                     #and orientation for that object
                     if len(keypoints) == 3 and arena_position is not None:
-                        self.robots[self.options['COLORS'][index]] = self.localize_robot(keypoints, arena_position)
+                        self.robots[self.options.COLORS[index]] = self.localize_robot(keypoints, arena_position)
 
             cv2.imshow('frame', img_with_keypoints)
             cv2.waitKey(1)
@@ -7,6 +7,7 @@ View the full repository here https://github.com/car-chase/amoebots
 '''
 
 from serial import Serial
+from helpers import set_low_latency
 from message import Message
 
 class COMListener:
@@ -15,10 +16,10 @@ class COMListener:
     sends an "add" message to the communication level.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         listener_input (Queue): The queue for receiving messages in the listener level.
         com_input (Queue): The queue for sending messages to the communication level.
 
@@ -48,8 +49,11 @@ class COMListener:
         }))
 
         try:
-            with Serial(address, self.options["BAUD"],
-                        timeout=self.options["COM_PORT_TIMEOUT"]) as port:
+            with Serial(address, self.options.BAUD,
+                        timeout=self.options.COM_PORT_TIMEOUT) as port:
+
+                # Cut the USB-serial buffering delay before talking to the robot
+                set_low_latency(port)
 
                 # Call the ping command
                 port.write(bytes("99 0", "utf-8"))
@@ -81,5 +85,5 @@ class COMListener:
             }))
 
             # Raise the exception again so it isn't lost.
-            if self.options["RAISE_ERRORS_AFTER_CATCH"]:
+            if self.options.RAISE_ERRORS_AFTER_CATCH:
                 raise
@@ -6,13 +6,14 @@ Created on Nov 1, 2016
 View the full repository here https://github.com/car-chase/amoebots
 '''
 
-from multiprocessing import Process, Queue
-from time import sleep
+from multiprocessing import Process
+from queue import Empty, Full
 from bot_process import BotProcess
 from cam_process import CameraProcess
 from com_listener import COMListener
 from tcp_listener import TCPListener
 from serial.tools import list_ports
+from helpers import PipeQueue
 from message import Message
 
 class CommunicationLevel:
@@ -21,10 +22,10 @@ class CommunicationLevel:
     higher levels and the robots.  It also listens for new connections.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         keep_running (bool): Boolean that keeps the main event loop running.
         connections (dict): A dictionary that maps the program levels to their respective queues.
     """
@@ -53,7 +54,9 @@ class CommunicationLevel:
         }))
 
         # start the tcp listener
-        tcp_listener_input = Queue()
+        # Child input queues are single-producer single-consumer, so a pipe
+        # replaces the heavier multiprocessing.Queue on these links
+        tcp_listener_input = PipeQueue()
         tcp_listener = TCPListener(self.options)
         tcp_listener_process = Process(target=tcp_listener.tcp_listener_main,
                                        args=(tcp_listener_input, self.connections["COM_LEVEL"][1]))
@@ -61,7 +64,7 @@ class CommunicationLevel:
         self.connections['TCP_LISTENER'] = ['running', tcp_listener_input, tcp_listener_process]
 
         # start the camera process
-        camera_input = Queue()
+        camera_input = PipeQueue()
         camera = CameraProcess(self.options)
         camera_process = Process(target=camera.cam_process_main,
                                  args=(camera_input, self.connections["COM_LEVEL"][1]))
@@ -74,13 +77,23 @@ class CommunicationLevel:
             'directive': "add"
         }))
 
+        # bind hot-loop values to locals once; attribute lookups inside the
+        # loop are pure overhead
+        com_queue = self.connections["COM_LEVEL"][1]
+        interval = self.options.COM_LOOP_SLEEP_INTERVAL
+
         # infinite loop to keep checking the queue for information
         while self.keep_running:
             try:
-                # get items from queue until it's empty
-                while not self.connections["COM_LEVEL"][1].empty():
+                # block until a message arrives; the sleep interval is kept as
+                # an idle backstop so the COM port scan still runs when quiet
+                try:
+                    message = com_queue.get(timeout=interval)
+                except Empty:
+                    message = None
 
-                    message = self.connections["COM_LEVEL"][1].get()
+                # process messages until the queue is drained
+                while message is not None:
 
                     # make sure the message is a Message object
                     if isinstance(message, Message):
@@ -92,13 +105,19 @@ class CommunicationLevel:
                         elif message.category == 'response':
                             message.destination = "MOV_LEVEL"
 
+                        elif message.category == 'movement-batch':
+                            # Expand batched movement commands here, next to
+                            # their consumer; the batch itself is not relayed
+                            self.process_movement_batch(message)
+                            message.destination = "COM_LEVEL"
+
                         # relay message to destination
                         if message.destination != "COM_LEVEL":
                             relay_to = self.connections[message.destination][1]
 
-                            relay_to.put(message)
+                            self.put_bounded(relay_to, message)
 
-                        elif self.options['DUMP_MSGS_TO_MAIN']:
+                        elif self.options.DUMP_MSGS_TO_MAIN:
                             self.connections["MAIN_LEVEL"][1].put(message)
 
                     # un-handled message
@@ -107,12 +126,14 @@ class CommunicationLevel:
                         # for raw output to the screen
                         self.connections["MAIN_LEVEL"][1].put(message)
 
+                    try:
+                        message = com_queue.get_nowait()
+                    except Empty:
+                        message = None
+
                 # check for unconnected robots
                 self.scan_com_ports()
 
-                # sleep so that this is not constantly eating processing time
-                sleep(self.options["COM_LOOP_SLEEP_INTERVAL"])
-
             except Exception as err:
                 # Catch all exceptions and log them.
                 self.connections["MAIN_LEVEL"][1].put(Message('COM_LEVEL', 'MAIN_LEVEL', 'error', {
@@ -120,7 +141,7 @@ class CommunicationLevel:
                 }))
 
                 # Raise the exception again so it isn't lost.
-                if self.options["RAISE_ERRORS_AFTER_CATCH"]:
+                if self.options.RAISE_ERRORS_AFTER_CATCH:
                     raise
 
     def process_command(self, message):
@@ -134,7 +155,7 @@ class CommunicationLevel:
 
         if message.data['directive'] == 'add':
             # if the command is an 'add' directive start a new BotProcess
-            bot_input = Queue()
+            bot_input = PipeQueue()
             bot = BotProcess(message.origin, self.options)
             bot_process = Process(target=bot.bot_process_main,
                                   args=(bot_input, self.connections["COM_LEVEL"][1]))
@@ -180,6 +201,57 @@ class CommunicationLevel:
             # End the com_level
             self.keep_running = False
 
+    def put_bounded(self, queue_obj, message):
+        """
+        Puts a message on a bounded inter-level queue, waiting briefly if it is full.  If
+        the consumer still hasn't drained the queue after the wait, the message is dropped
+        and the drop is reported to the main level if its queue has room, so one slow
+        consumer can't stall the event loop.  Responses are exempt from the drop policy:
+        they feed the movement level's in-flight counters, and losing one would leave a
+        counter out of sync forever, so they retry until the queue drains.
+
+        Args:
+            queue_obj (Queue/PipeQueue): The queue to put the message on.
+            message (Message): The message to send.
+        """
+
+        if message.category == 'response':
+            while True:
+                try:
+                    queue_obj.put(message, timeout=0.1)
+                    return
+                except Full:
+                    continue
+
+        try:
+            queue_obj.put(message, timeout=0.1)
+        except Full:
+            try:
+                self.connections["MAIN_LEVEL"][1].put_nowait(
+                    Message('COM_LEVEL', 'MAIN_LEVEL', 'error', {
+                        'message': f'Dropped a message to {message.destination}; '
+                                   'the queue is full'
+                    }))
+            except Full:
+                pass
+
+    def process_movement_batch(self, message):
+        """
+        Unpacks a batched movement message into individual movement commands for the
+        destination bot process.  Senders batch their command sequences so one inter-level
+        queue transfer replaces one per command.
+
+        Args:
+            message (Message): The message carrying a list of (command, magnitude) tuples.
+        """
+
+        bot_queue = self.connections[message.destination][1]
+        for command, magnitude in message.data['commands']:
+            bot_queue.put(Message(message.origin, message.destination, 'movement', {
+                'command': command,
+                'magnitude': magnitude
+            }))
+
     def scan_com_ports(self):
         """
         Scans the open COM ports and opens a listener on them to see if it can establish a
@@ -205,7 +277,7 @@ class CommunicationLevel:
                 }))
 
                 #start new process if the serial port is not already open
-                com_listener_input = Queue()
+                com_listener_input = PipeQueue()
                 com_listener = COMListener(self.options)
                 com_listener_process = Process(target=com_listener.com_listener_main,
                                                args=(address, com_listener_input,
@@ -5,3 +5,96 @@ Created on Oct 11, 2016
 
 View the full repository here https://github.com/car-chase/amoebots
 '''
+
+import socket
+import sys
+import selectors
+from functools import lru_cache
+from multiprocessing import Pipe
+from queue import Empty, Full
+
+class PipeQueue:
+    """
+    A queue-like wrapper around a one-way pipe, for links with a single producer and a
+    single consumer.  A full multiprocessing.Queue runs a feeder thread and a lock behind
+    every transfer; between exactly two processes a pipe does the same job with much less
+    per-message overhead.  The wrapper keeps the Queue method names so call sites don't
+    care which one they were handed.
+
+    Attributes:
+        reader (Connection): The receiving end of the pipe.
+        writer (Connection): The sending end of the pipe.
+    """
+
+    def __init__(self):
+        self.reader, self.writer = Pipe(duplex=False)
+
+    def put(self, item, timeout=None):
+        """
+        Sends an item down the pipe.  With a timeout, waits up to that many seconds for
+        the pipe to accept more data and raises queue.Full if the OS buffer stays full —
+        a stalled or dead consumer then surfaces as backpressure instead of hanging the
+        sender.  Without a timeout the send blocks until there is room.
+
+        Args:
+            item: The object to send.
+            timeout (float): Seconds to wait for the pipe to become writable.
+        """
+        if timeout is not None:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.writer, selectors.EVENT_WRITE)
+                if not selector.select(timeout):
+                    raise Full
+        self.writer.send(item)
+
+    def get(self, timeout=None):
+        """
+        Receives an item, blocking until one arrives.  Raises queue.Empty if the timeout
+        expires first, matching Queue.get.
+
+        Args:
+            timeout (float): Seconds to wait for an item (None to wait forever).
+        """
+        if timeout is None or self.reader.poll(timeout):
+            return self.reader.recv()
+        raise Empty
+
+    def get_nowait(self):
+        """
+        Receives an item if one is already waiting, raising queue.Empty otherwise.
+        """
+        if self.reader.poll():
+            return self.reader.recv()
+        raise Empty
+
+    def empty(self):
+        """
+        Returns whether the pipe has no item waiting.
+        """
+        return not self.reader.poll()
+
+@lru_cache(maxsize=1)
+def get_listener_ip():
+    """
+    Resolves the IP address of the host the controller is running on.  The result is cached so
+    the blocking DNS lookup only ever happens once, and only when the TCP listener first needs
+    it rather than when the controller is imported.
+    """
+    return socket.gethostbyname(socket.gethostname())
+
+def set_low_latency(port):
+    """
+    Puts a serial port into low latency mode.  Linux USB-serial drivers buffer reads for up to
+    16ms by default, which puts a floor on how fast the controller can react to bot responses;
+    the ASYNC_LOW_LATENCY flag drops that to about 1ms.  Ports or platforms that don't support
+    the flag are left as-is.
+
+    Args:
+        port (Serial): The open serial port to configure.
+    """
+    if sys.platform == 'linux':
+        try:
+            port.set_low_latency_mode(True)
+        except (AttributeError, ValueError):
+            # Older pyserial or a driver without the flag; keep the default latency.
+            pass
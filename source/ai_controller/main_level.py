@@ -6,8 +6,9 @@ Created on Feb 24, 2017
 View the full repository here https://github.com/car-chase/amoebots
 '''
 
+import os
 from multiprocessing import Process, Queue
-from time import sleep
+from queue import Empty
 from communication_level import CommunicationLevel
 from movement_level import MovementLevel
 from ai_level import AiLevel
@@ -19,20 +20,23 @@ class MainLevel:
     manages the lower levels, and consolidates log messages.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
+        signal_fd (int): The read end of the pipe that signals write to (None to disable).
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
+        signal_fd (int): The read end of the pipe that signals write to.
         keep_running (bool): Boolean that keeps the main event loop running.
         connections (dict): A dictionary that maps the program levels to their respective queues.
         main_input_queue (queue): The queue that all levels use to send logs.
     """
 
-    def __init__(self, options):
+    def __init__(self, options, signal_fd=None):
         self.options = options
+        self.signal_fd = signal_fd
         self.keep_running = True
         self.connections = {}
-        self.main_input_queue = Queue()
+        self.main_input_queue = Queue(options.QUEUE_MAX)
 
     def main_loop(self):
         """
@@ -41,23 +45,39 @@ class MainLevel:
 
         self.init_levels()
 
+        # Bind hot-loop values to locals once; attribute lookups inside the
+        # loop are pure overhead
+        main_queue = self.main_input_queue
+        interval = self.options.MAIN_LOOP_SLEEP_INTERVAL
+
         # Infinite loop to keep checking the queue for information
         while self.keep_running:
 
-            # Check the main input queue and display logs
+            # Block until a log arrives instead of polling; the sleep interval
+            # is kept as an idle backstop so signals are still noticed promptly.
+            try:
+                self.print_message(main_queue.get(timeout=interval))
+            except Empty:
+                pass
+
+            # Display any remaining logs
             self.check_messages()
 
-            sleep(self.options["MAIN_LOOP_SLEEP_INTERVAL"])
+            # A byte on the signal pipe means a SIGINT arrived; shut down gracefully.
+            if self.shutdown_requested():
+                print("Initiating shutdown")
+                self.shutdown()
 
     def init_levels(self):
         """
         Initilizes all the levels of the controller.
         """
 
-        # Make the queues
-        com_input_queue = Queue()
-        mov_input_queue = Queue()
-        ai_input_queue = Queue()
+        # Make the queues; bounding them keeps a stalled consumer from
+        # letting a burst of messages grow without limit
+        com_input_queue = Queue(self.options.QUEUE_MAX)
+        mov_input_queue = Queue(self.options.QUEUE_MAX)
+        ai_input_queue = Queue(self.options.QUEUE_MAX)
 
         # Instantiate the levels
         com_level = CommunicationLevel(self.options)
@@ -83,19 +103,40 @@ class MainLevel:
         self.connections["MOV_LEVEL"] = ["running", mov_input_queue, mov_level_process]
         self.connections["AI_LEVEL"] = ["running", ai_input_queue, ai_level_process]
 
+    def shutdown_requested(self):
+        """
+        Checks the signal pipe for a pending signal.  Signals write a single byte to the pipe,
+        so draining it tells the main loop a shutdown was requested without doing any work in
+        the signal handler itself.
+        """
+        if self.signal_fd is None:
+            return False
+
+        try:
+            return os.read(self.signal_fd, 1) != b''
+        except BlockingIOError:
+            return False
+
     def check_messages(self):
         """
         Checks the main input queue for new messages.
         """
         while not self.main_input_queue.empty():
-            message = self.main_input_queue.get()
-
-            # Ensure that the message is a log message
-            if isinstance(message, Message):
-                print(message.to_string())
-            else:
-                # Otherwise print out the raw data
-                print('RAW:', message)
+            self.print_message(self.main_input_queue.get())
+
+    def print_message(self, message):
+        """
+        Displays a single log message.
+
+        Args:
+            message (Message): The message object to display.
+        """
+        # Ensure that the message is a log message
+        if isinstance(message, Message):
+            print(message.to_string())
+        else:
+            # Otherwise print out the raw data
+            print('RAW:', message)
 
     def shutdown(self):
         """
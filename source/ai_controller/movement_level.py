@@ -7,10 +7,11 @@ View the full repository here https://github.com/car-chase/amoebots
 '''
 
 import random
-import math
-from time import sleep
-import jsonpickle
+from queue import Empty, Full
+import numpy as np
+from time import monotonic
 from message import Message
+from movement_math import get_distance, get_angle
 from world_model import Arena, Robot, Sensor
 
 class MovementLevel:
@@ -20,10 +21,10 @@ class MovementLevel:
     movement commands into low-level commands that the robots can interpret.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         keep_running (bool): Boolean that keeps the main event loop running.
         connections (dict): A dictionary that maps the program levels to their respective queues.
     """
@@ -32,15 +33,70 @@ class MovementLevel:
         self.options = options
         self.keep_running = True
         self.connections = {}
-        self.world_model = Arena(options["ARENA_SIZE"],
-                                 options["ARENA_SIZE_CM"],
-                                 options["GOAL_LOCATIONS"])
+        self.world_model = Arena(options.ARENA_SIZE,
+                                 options.ARENA_SIZE_CM,
+                                 options.GOAL_LOCATIONS)
         self.robots = dict()
         self.sensors = dict()
+
+        # Indexes over self.robots so id/number lookups are O(1) instead of
+        # linear scans in the event loop
+        self.robots_by_id = dict()
+        self.robots_by_number = dict()
+
+        # Aggregate health counters, maintained at the exact sites that flip
+        # the underlying flags, so the per-tick readiness gates are O(1)
+        # instead of scans over every robot and sensor
+        self.errored_devices = 0
+        self.pending_commands = 0
+        self.unreceived_sensors = 0
+        self.unasked_sensors = set()
+
+        # Cache of each robot's current tile so repeated find_tile calls in
+        # one tick don't rescan the whole grid
+        self.robot_tiles = dict()
+
+        # The camera sensor, kept for O(1) reconnect handling
+        self.camera_sensor = None
+
+        # Payloads for the fixed commands sent on every poll; receivers never
+        # mutate message data, so the same dict can back every send instead of
+        # being rebuilt each time
+        self.robot_info_data = {
+            'command': 90,
+            'magnitude': 0,
+            'message': "Determine robot info"
+        }
+        self.poll_sim_data = {
+            'command': 99,
+            'magnitude': 0,
+            'message': 'Get simulator sensor data'
+        }
+        self.poll_cam_data = {
+            'command': 91,
+            'magnitude': 0,
+            'message': 'Get camera sensor data'
+        }
         self.aligned = False
         self.processing_plan = False
         self.scramble_robots = 0
 
+        # Dispatch tables mapping directives/contents to their handlers so
+        # message processing is a single hash lookup instead of an if/elif walk
+        self.command_handlers = {
+            'add': self.command_add,
+            'execute-plan': self.command_execute_plan,
+            'no-plan': self.command_no_plan,
+            'failure': self.command_failure,
+            'shutdown': self.command_shutdown,
+        }
+        self.response_handlers = {
+            'robot-info': self.response_robot_info,
+            'sensor-camera': self.response_sensor_camera,
+            'ping': self.response_ping,
+            'move-result': self.response_move_result,
+        }
+
     def movement_level_main(self, mov_input, com_input, ai_input, main_input):
         """
         The main event loop of the movement level.  The loop checks for messages to the level,
@@ -62,14 +118,41 @@ class MovementLevel:
             'message': 'MOV_LEVEL is running'
         }))
 
+        # Share the world grid with the AI level; plan requests then carry a
+        # name/version token instead of a serialized world model
+        self.world_model.init_shared_state()
+
+        # Bind hot-loop values to locals once; attribute lookups inside the
+        # loop are pure overhead
+        mov_queue = self.connections['MOV_LEVEL'][1]
+        main_queue = self.connections['MAIN_LEVEL'][1]
+        ai_queue = self.connections['AI_LEVEL'][1]
+        interval = self.options.MOV_LOOP_SLEEP_INTERVAL
+        batch_size = self.options.MOV_BATCH_SIZE
+        dump_msgs = self.options.DUMP_MSGS_TO_MAIN
+
+        # The periodic checks run on their own deadline instead of after every
+        # message batch
+        next_tick = monotonic() + interval
+
         # Infinite loop to keep the process running
         while self.keep_running:
             try:
 
-                # Get items from input queue until it is not empty
-                while not self.connections['MOV_LEVEL'][1].empty():
-
-                    message = self.connections['MOV_LEVEL'][1].get()
+                # Process at most a batch of messages per pass so a busy
+                # producer cannot starve the periodic checks below.  The
+                # first fetch blocks as the idle wait; the rest drain what is
+                # already queued.  Fetching at the top of the iteration means
+                # a message is never pulled off the queue without being
+                # processed.
+                for index in range(batch_size):
+                    try:
+                        if index:
+                            message = mov_queue.get_nowait()
+                        else:
+                            message = mov_queue.get(timeout=interval)
+                    except Empty:
+                        break
 
                     # make sure the response is a list object
                     if isinstance(message, Message):
@@ -84,50 +167,55 @@ class MovementLevel:
                         #relay message to destination
                         if message.destination != "MOV_LEVEL":
                             relay_to = self.connections[message.destination][1]
-                            relay_to.put(message)
+                            self.put_bounded(relay_to, message)
 
-                        elif self.options['DUMP_MSGS_TO_MAIN']:
-                            self.connections["MAIN_LEVEL"][1].put(message)
+                        elif dump_msgs:
+                            main_queue.put(message)
 
                     else:
                         # un-handled message
                         # send this un-handled message to main
                         # for raw output to the screen
-                        self.connections["MAIN_LEVEL"][1].put(message)
-
-                # Scramble robot positions if necessary
-                if self.scramble_robots >= 5:
-                    for port_id, robot in self.robots.items():
-                        self.freakout(port_id)
-                    self.scramble_robots = 0
-
-                # Check the sensors
-                self.check_sensors()
-
-                # Check if align is necessary
-                if self.ready_for_align():
-                    self.align_robots()
-
-                # Send message to move into formation
-                if self.ready_for_formation():
-                    self.connections['AI_LEVEL'][1].put(
-                        Message('MOV_LEVEL', 'AI_LEVEL', 'command', {
-                            'message': "Submitting world model for pathfinding plan",
-                            'directive': "generate-plan",
-                            'args': jsonpickle.encode(self.world_model)
-                        }))
-                    self.processing_plan = True
-
-                sleep(self.options["MOV_LOOP_SLEEP_INTERVAL"])
+                        main_queue.put(message)
+
+                # Skip the periodic checks until their deadline comes up
+                if monotonic() >= next_tick:
+
+                    # Scramble robot positions if necessary
+                    if self.scramble_robots >= 5:
+                        for port_id in self.robots:
+                            self.freakout(port_id)
+                        self.scramble_robots = 0
+
+                    # Check the sensors
+                    self.check_sensors()
+
+                    # Check if align is necessary
+                    if self.ready_for_align():
+                        self.align_robots()
+
+                    # Send message to move into formation
+                    if self.ready_for_formation():
+                        ai_queue.put(
+                            Message('MOV_LEVEL', 'AI_LEVEL', 'command', {
+                                'message': "Submitting world model for pathfinding plan",
+                                'directive': "generate-plan",
+                                'shm_name': self.world_model.shm.name,
+                                'arena_size': self.world_model.width,
+                                'arena_size_cm': self.world_model.width_cm
+                            }))
+                        self.processing_plan = True
+
+                    next_tick = monotonic() + interval
 
             except Exception as err:
                 # Catch all exceptions and log them.
-                self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
+                main_queue.put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
                     'message': str(err)
                 }))
 
                 # Raise the exception again so it isn't lost.
-                if self.options["RAISE_ERRORS_AFTER_CATCH"]:
+                if self.options.RAISE_ERRORS_AFTER_CATCH:
                     raise
 
     def process_command(self, message):
@@ -139,48 +227,81 @@ class MovementLevel:
             message (Message): The message object to be processed.
         """
 
-        # Determine what kind of connection this is
-        if message.data['directive'] == 'add':
-            self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', message.origin, 'movement', {
-                'command': 90,
-                'magnitude': 0,
-                'message': "Determine robot info"
-            }))
+        # Determine what kind of command this is and dispatch it
+        handler = self.command_handlers.get(message.data.get('directive'))
+        if handler is not None:
+            handler(message)
 
-        elif message.data["directive"] == 'execute-plan':
-            # Plan found, so execute it.
-            self.process_plan(message.data['args'])
+    def command_add(self, message):
+        """
+        Handles the 'add' directive by asking the new device for its info.
 
-            # Force everything to realign and then recalculate path
-            self.aligned = False
-            self.processing_plan = False
+        Args:
+            message (Message): The message object to be processed.
+        """
+        self.put_bounded(self.connections['COM_LEVEL'][1],
+                         Message('MOV_LEVEL', message.origin, 'movement', self.robot_info_data))
+
+    def command_execute_plan(self, message):
+        """
+        Handles the 'execute-plan' directive by executing the plan from the AI level.
+
+        Args:
+            message (Message): The message object to be processed.
+        """
+        # Plan found, so execute it.
+        self.process_plan(message.data['args'])
 
-        elif message.data["directive"] == 'no-plan':
-            # No plan so let the program continue
-            self.processing_plan = False
+        # Force everything to realign and then recalculate path
+        self.aligned = False
+        self.processing_plan = False
 
-        elif message.category == 'command' and message.data['directive'] == 'failure':
+    def command_no_plan(self, message):
+        """
+        Handles the 'no-plan' directive.
 
-            if self.robots.get(message.origin) is not None:
-                # Set the connection error for a robot
-                self.robots[message.origin].connection_error = True
-                # If it is a simulator robot, set it's sensor connection error too.
-                if self.robots[message.origin].robot_type == 'sim-smores':
-                    self.sensors[message.origin].connection_error = True
-            elif self.sensors.get(message.origin) is not None:
-                # Set the connection error for a sensor
-                self.sensors[message.origin].connection_error = True
+        Args:
+            message (Message): The message object to be processed.
+        """
+        # No plan so let the program continue
+        self.processing_plan = False
 
-        elif message.data['directive'] == 'shutdown' and message.origin == 'MAIN_LEVEL':
-            # The level has been told to shutdown.  Kill all the children!!!
-            # Loop over the child processes and shut them shutdown
+    def command_failure(self, message):
+        """
+        Handles the 'failure' directive by flagging the connection error on the failed device.
 
-            self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'info', {
-                'message': 'Shutting down MOV_LEVEL'
-            }))
+        Args:
+            message (Message): The message object to be processed.
+        """
+        if self.robots.get(message.origin) is not None:
+            # Set the connection error for a robot
+            self.set_connection_error(self.robots[message.origin], True)
+            # If it is a simulator robot, set it's sensor connection error too.
+            if self.robots[message.origin].robot_type == 'sim-smores':
+                self.set_connection_error(self.sensors[message.origin], True)
+        elif self.sensors.get(message.origin) is not None:
+            # Set the connection error for a sensor
+            self.set_connection_error(self.sensors[message.origin], True)
+
+    def command_shutdown(self, message):
+        """
+        Handles the 'shutdown' directive by stopping the event loop.
+
+        Args:
+            message (Message): The message object to be processed.
+        """
+        if message.origin != 'MAIN_LEVEL':
+            return
+
+        self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'info', {
+            'message': 'Shutting down MOV_LEVEL'
+        }))
+
+        # Release the shared world state
+        self.world_model.close_shared_state()
 
-            # End the com_level
-            self.keep_running = False
+        # End the com_level
+        self.keep_running = False
 
     def process_response(self, message):
         """
@@ -191,108 +312,133 @@ class MovementLevel:
             message (Message): The message object to be processed.
         """
 
-        if message.data["content"] == 'robot-info':
-            # Configure the movement level to control this device
-            if message.data['data']['type'] == 'sim-smores':
-                self.robots[message.origin] = Robot(None, message.origin,
-                                                    message.data['data']['type'])
-                self.sensors[message.origin] = Sensor(message.origin,
-                                                      message.data['data']['type'])
-
-            elif message.data['data']['type'] == 'smores':
-                # Check if new robot is actually a recovered connection and update it
-                print("reconnect")
-                for port_id, robot in self.robots.items():
-                    if robot.robot_id == message.data['data']['id']:
-                        print("recovered")
-                        robot.connection_error = False
-                        robot.port_id = message.origin
-                        del self.robots[port_id]
-                        self.robots[message.origin] = robot
-
-                if self.robots.get(message.origin) is None:
-                    self.robots[message.origin] = Robot(message.data['data']['id'], message.origin,
-                                                        message.data['data']['type'])
-
-            elif message.data['data']['type'] == 'camera':
-                # Check if new sensor is actually a recovered connection and update it
-                for port_id, sensor in self.sensors.items():
-                    if sensor.sensor_type == 'camera':
-                        sensor.connection_error = False
-                        self.sensors.pop(port_id)
-                        self.sensors[message.origin] = sensor
-                        return
-
-                self.sensors[message.origin] = Sensor(message.origin,
-                                                      message.data['data']['type'])
-
-        elif message.data["content"] == 'sensor-camera':
-            sensor = self.sensors[message.origin]
+        # Determine what kind of response this is and dispatch it
+        handler = self.response_handlers.get(message.data.get('content'))
+        if handler is not None:
+            handler(message)
 
-            if self.options['SHOW_SENSOR_DUMPS']:
-                self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'info', {
-                    'message': 'Data received from the sensor camera\n' + str(message.data["data"])
-                }))
+    def response_robot_info(self, message):
+        """
+        Handles the 'robot-info' response by registering the new robot or sensor, recovering
+        dropped connections where possible.
 
-            if message.data["data"] == {}:
-                sensor.asked = False
+        Args:
+            message (Message): The message object to be processed.
+        """
+        # Configure the movement level to control this device
+        if message.data['data']['type'] == 'sim-smores':
+            self.register_robot(Robot(None, message.origin,
+                                      message.data['data']['type']))
+            self.register_sensor(Sensor(message.origin,
+                                        message.data['data']['type']))
+
+        elif message.data['data']['type'] == 'smores':
+            # Check if new robot is actually a recovered connection and update it
+            print("reconnect")
+            robot = self.robots_by_id.get(message.data['data']['id'])
+            if robot is not None:
+                print("recovered")
+                self.set_connection_error(robot, False)
+                del self.robots[robot.port_id]
+                robot.port_id = message.origin
+                self.robots[message.origin] = robot
             else:
-                # iterate over robots in the message
-                for robot_id in message.data['data']:
-                    # get robot associated with robot_id
-                    robot = self.get_robot(robot_id)
-
-                    if robot is not None:
-                        # read position and heading
-                        new_position = (message.data["data"][robot_id]['x'],
-                                        message.data["data"][robot_id]['y'])
-                        if new_position is not None:
-                            robot.position = new_position
-                            robot.heading = message.data["data"][robot_id]['heading']
-                            self.update_tile(robot)
-
-                sensor.received = True
-                self.aligned = False
-
-        elif message.data["content"] == 'ping':
-            robot = self.robots.get(message.origin)
-            if robot is None:
-                self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
-                    'message': 'Could not find the robot for the ping ' + message.origin
-                }))
+                self.register_robot(Robot(message.data['data']['id'], message.origin,
+                                          message.data['data']['type']))
+
+        elif message.data['data']['type'] == 'camera':
+            # Check if new sensor is actually a recovered connection and update it
+            sensor = self.camera_sensor
+            if sensor is not None:
+                self.set_connection_error(sensor, False)
+                self.sensors.pop(sensor.port_id)
+                sensor.port_id = message.origin
+                self.sensors[message.origin] = sensor
                 return
 
-            # make sure that the robot is in position
-            if robot.robot_type == "sim-smores":
-                new_position = ((message.data['data']['x'] * 100),
-                                (message.data['data']['y'] * 100))
-                if new_position is not None:
-                    robot.position = new_position
-                    robot.heading = message.data['data']['heading']
+            self.register_sensor(Sensor(message.origin,
+                                        message.data['data']['type']))
+
+    def response_sensor_camera(self, message):
+        """
+        Handles the 'sensor-camera' response by updating robot positions from the camera data.
+
+        Args:
+            message (Message): The message object to be processed.
+        """
+        sensor = self.sensors[message.origin]
+
+        if self.options.SHOW_SENSOR_DUMPS:
+            self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'info', {
+                'message': f'Data received from the sensor camera\n{message.data["data"]}'
+            }))
+
+        if message.data["data"] == {}:
+            self.mark_asked(sensor, False)
+        else:
+            # iterate over robots in the message
+            for robot_id in message.data['data']:
+                # get robot associated with robot_id
+                robot = self.get_robot(robot_id)
+
+                if robot is not None:
+                    # read position and heading
+                    robot.position = (message.data["data"][robot_id]['x'],
+                                      message.data["data"][robot_id]['y'])
+                    robot.heading = message.data["data"][robot_id]['heading']
                     self.update_tile(robot)
 
-                sensor = self.sensors[message.origin]
-                sensor.received = True
-                self.aligned = False
-
-        elif message.data["content"] == 'move-result':
-            robot = self.robots[message.origin]
-            robot.queued_commands -= 1
-
-            # If it's done moving, ask for it's position again.
-            if robot.queued_commands == 0 and robot.robot_type == "sim-smores":
-                sensor = self.sensors[message.origin]
-                sensor.asked = False
-                sensor.received = False
-            elif robot.queued_commands == 0 and robot.robot_type == "smores":
-                # Make sure that all the robots are done moving
-                for port_id, robot in self.robots.items():
-                    if robot.queued_commands != 0:
-                        return
-
-                sensor = self.sensors["CAM_PROCESS"]
-                sensor.asked = False
-                sensor.received = False
+            self.mark_received(sensor, True)
+            self.aligned = False
+
+    def response_ping(self, message):
+        """
+        Handles the 'ping' response by updating the position of simulator robots.
+
+        Args:
+            message (Message): The message object to be processed.
+        """
+        robot = self.robots.get(message.origin)
+        if robot is None:
+            self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
+                'message': f'Could not find the robot for the ping {message.origin}'
+            }))
+            return
+
+        # make sure that the robot is in position
+        if robot.robot_type == "sim-smores":
+            robot.position = ((message.data['data']['x'] * 100),
+                              (message.data['data']['y'] * 100))
+            robot.heading = message.data['data']['heading']
+            self.update_tile(robot)
+
+            self.mark_received(self.sensors[message.origin], True)
+            self.aligned = False
+
+    def response_move_result(self, message):
+        """
+        Handles the 'move-result' response by marking the command complete and re-polling the
+        sensors once all the robot's commands have finished.
+
+        Args:
+            message (Message): The message object to be processed.
+        """
+        robot = self.robots[message.origin]
+        self.adjust_queued_commands(robot, -1)
+
+        # If it's done moving, ask for it's position again.
+        if robot.queued_commands == 0 and robot.robot_type == "sim-smores":
+            sensor = self.sensors[message.origin]
+            self.mark_asked(sensor, False)
+            self.mark_received(sensor, False)
+        elif robot.queued_commands == 0 and robot.robot_type == "smores":
+            # Make sure that all the robots are done moving
+            if self.pending_commands != 0:
+                return
+
+            sensor = self.sensors["CAM_PROCESS"]
+            self.mark_asked(sensor, False)
+            self.mark_received(sensor, False)
 
     def check_sensors(self):
         """
@@ -300,36 +446,31 @@ class MovementLevel:
         """
 
         # Make sure that all the robots have checked in
-        if len(self.robots) < self.options["NUMBER_OF_DEVICES"]:
+        if len(self.robots) < self.options.NUMBER_OF_DEVICES:
             return
 
-        # Make sure that there are no errored robots
-        for port_id, robot in self.robots.items():
-            if robot.connection_error:
-                return
+        # Make sure that there are no errored robots or sensors
+        if self.errored_devices:
+            return
 
-        # Make sure that there are no errored sensors
-        for port_id, sensor in self.sensors.items():
-            if sensor.connection_error:
-                return
+        # Only the sensors that have not been asked yet need polling
+        com_queue = self.connections['COM_LEVEL'][1]
+        for sensor in tuple(self.unasked_sensors):
+            if sensor.sensor_type == 'sim-smores':
+                sent = self.put_bounded(
+                    com_queue,
+                    Message('MOV_LEVEL', sensor.port_id, 'movement', self.poll_sim_data))
+            elif sensor.sensor_type == 'camera':
+                sent = self.put_bounded(
+                    com_queue,
+                    Message('MOVE_LEVEL', sensor.port_id, 'movement', self.poll_cam_data))
+            else:
+                continue
 
-        # Iterate through all the sensors to poll them for updated data
-        for port_id, sensor in self.sensors.items():
-            if not sensor.asked and sensor.sensor_type == 'sim-smores':
-                self.connections['COM_LEVEL'][1].put(
-                    Message('MOV_LEVEL', sensor.port_id, 'movement', {
-                        'command': 99,
-                        'magnitude': 0,
-                        'message': 'Get simulator sensor data'
-                    }))
-            elif not sensor.asked and sensor.sensor_type == 'camera':
-                self.connections['COM_LEVEL'][1].put(
-                    Message('MOVE_LEVEL', sensor.port_id, 'movement', {
-                        'command': 91,
-                        'magnitude': 0,
-                        'message': 'Get camera sensor data'
-                    }))
-            sensor.asked = True
+            # a dropped poll never produces a response, so only mark the
+            # sensor asked when the poll was actually queued
+            if sent:
+                self.mark_asked(sensor, True)
 
     def ready_for_align(self):
         """
@@ -337,21 +478,15 @@ class MovementLevel:
         ready for the alignment process.
         """
 
-        if len(self.robots) < self.options["NUMBER_OF_DEVICES"]:
+        if len(self.robots) < self.options.NUMBER_OF_DEVICES:
             return False
 
-        for sensor_id, sensor in self.sensors.items():
-            if sensor.connection_error:
-                return False
-            elif not sensor.received:
-                return False
+        # Every device healthy, every sensor read, no commands in flight
+        if self.errored_devices or self.unreceived_sensors or self.pending_commands:
+            return False
 
-        for port_id, robot in self.robots.items():
-            if robot.connection_error:
-                return False
-            elif robot.queued_commands > 0:
-                return False
-            elif self.world_model.find_tile(robot) is None:
+        for robot in self.robots.values():
+            if self.find_tile(robot) is None:
                 # Robots need to be shaken apart
                 self.scramble_robots = 5
                 return False
@@ -368,44 +503,65 @@ class MovementLevel:
             return False
 
         # If a robot is not on its goal, return that it is ready.
-        for port_id, robot in self.robots.items():
-            if not self.world_model.find_tile(robot).goal:
+        for robot in self.robots.values():
+            tile = self.find_tile(robot)
+            if not self.world_model.is_goal(tile.position[0], tile.position[1]):
                 return True
 
         sensor = self.sensors.get("CAM_PROCESS")
         if sensor is not None and sensor.asked and sensor.received:
             print("asking")
-            sensor.asked = False
-            sensor.received = False
+            self.mark_asked(sensor, False)
+            self.mark_received(sensor, False)
 
         return False
 
     def align_robots(self):
         """
-        Iterate through all the robots and check if they are misaligned to their
-        tiles. If so the misaligned robots are realigned.
+        Check every robot against its tile center in one vectorized sweep and realign the
+        robots the sweep flags as misaligned.
         """
 
-        misaligned = 0
-        for port_id, robot in self.robots.items():
-            # align to grid if necessary
-            off_center = get_distance(robot.position, self.world_model.find_tile(robot).center)
+        robots = list(self.robots.values())
+
+        # Gather the per-robot state into parallel arrays so the misalignment
+        # test below is a single C-level pass instead of per-robot Python math
+        positions = np.empty((len(robots), 2), dtype=np.float32)
+        headings = np.empty(len(robots), dtype=np.float32)
+        cols = np.empty(len(robots), dtype=np.intp)
+        rows = np.empty(len(robots), dtype=np.intp)
+        for index, robot in enumerate(robots):
+            positions[index] = robot.position
+            headings[index] = robot.heading
+            cols[index], rows[index] = self.find_tile(robot).position
+
+        centers = self.world_model.centers[rows, cols]
+        off_center = np.hypot(positions[:, 0] - centers[:, 0],
+                              positions[:, 1] - centers[:, 1])
+
+        max_center = self.options.MAX_CNTR_MISALIGNMENT
+        max_north = self.options.MAX_NORTH_MISALIGNMENT
+        misaligned = (off_center > max_center) | ((headings > max_north) &
+                                                  (headings < 360 - max_north))
+
+        # Only the flagged robots drop back into Python to be realigned
+        for index in np.flatnonzero(misaligned):
+            robot = robots[index]
+            self.aligned = False
 
-            if (off_center > self.options['MAX_CNTR_MISALIGNMENT'] or
-                    (robot.heading > self.options['MAX_NORTH_MISALIGNMENT'] and
-                     robot.heading < (360 - self.options['MAX_NORTH_MISALIGNMENT']))
-               ):
-                misaligned += 1
-                self.aligned = False
+            # The per-robot log runs every tick a robot is misaligned, so
+            # it is opt-in; skipping it skips the formatting too
+            if self.options.VERBOSE_ALIGN:
+                self.connections["MAIN_LEVEL"][1].put(
+                    Message('MOV_LEVEL', 'MAIN_LEVEL', 'info', {
+                        'message': f'Robot {robot.robot_id} is {off_center[index]} cm off '
+                                   f'center with a heading of {robot.heading} degrees. '
+                                   'Alignment in progress.'
+                    }))
 
-                self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'info', {
-                    'message': 'Robot ' + str(robot.robot_id) + ' is ' + str(off_center) +
-                               ' cm off center with a heading of ' + str(robot.heading) +
-                               ' degrees. Alignment in progress.'
-                }))
+            self.align(robot)
 
-                self.align(robot)
-        if misaligned == 0:
+        if not misaligned.any():
             self.aligned = True
 
     def freakout(self, destination):
@@ -420,25 +576,28 @@ class MovementLevel:
             'message': 'Tile conflict, freakout in progress.'
         }))
 
-        self.robots[destination].queued_commands = self.options['FREAKOUT_ITERATIONS'] * 2
-        for count in range(self.options['FREAKOUT_ITERATIONS']):
-            # Generate turn command
-            action = random.randint(3, 4)
-            magnitude = random.randint(0, 180)
-
-            self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', destination, 'movement', {
-                'command': action,
-                'magnitude': magnitude
-            }))
-
-            # Generate move command
-            action = 1
-            magnitude = random.randint(8, 16)
-
-            self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', destination, 'movement', {
-                'command': action,
-                'magnitude': magnitude
-            }))
+        robot = self.robots[destination]
+        iterations = self.options.FREAKOUT_ITERATIONS
+
+        # Draw all the random values in one call per sequence
+        turn_commands = random.choices((3, 4), k=iterations)
+        turn_magnitudes = random.choices(range(181), k=iterations)
+        move_magnitudes = random.choices(range(8, 17), k=iterations)
+
+        # Interleave the turn and move commands into one batch; a single put
+        # replaces the 2 * FREAKOUT_ITERATIONS messages this used to take
+        commands = []
+        for turn, turn_mag, move_mag in zip(turn_commands, turn_magnitudes, move_magnitudes):
+            commands.append((turn, turn_mag))
+            commands.append((1, move_mag))
+
+        # a dropped batch produces no move-results, so only count the
+        # commands against the robot when the batch was actually queued
+        if self.put_bounded(self.connections['COM_LEVEL'][1],
+                            Message('MOV_LEVEL', destination, 'movement-batch', {
+                                'commands': commands
+                            })):
+            self.adjust_queued_commands(robot, iterations * 2 - robot.queued_commands)
 
         # Example command
         # self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', destination, 'movement', {
@@ -455,51 +614,70 @@ class MovementLevel:
             Robot (Robot): the robot to align the the tile center
         """
 
-        tile_center = self.world_model.find_tile(robot).center
-        if tile_center is None:
+        tile = self.find_tile(robot)
+        if tile is None:
             self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
-                'message': 'Error aligning, no tile center found for ' + robot.robot_id
+                'message': f'Error aligning, no tile center found for {robot.robot_id}'
             }))
             return
 
+        tile_center = self.world_model.center_of(tile.position[0], tile.position[1])
+
         # get angle of center relative to north
-        center_heading = get_angle(robot.position, tile_center)
+        center_heading = get_angle(robot.position[0], robot.position[1],
+                                   tile_center[0], tile_center[1])
 
         # get distance to center
-        distance_to_center = get_distance(robot.position, tile_center)
+        distance_to_center = get_distance(robot.position[0], robot.position[1],
+                                          tile_center[0], tile_center[1])
 
         # get the angle to turn to center
         angle_to_center = robot.heading - center_heading
 
-        # make right turn center if left turn > 180
-        turn_center_command, angle_to_center = get_turn(angle_to_center)
+        # make right turn to center if left turn > 180 (command 4 is a right
+        # turn); inlined so the per-robot hot path skips the call dispatch
+        angle_to_center = angle_to_center % 360
+        if angle_to_center > 180:
+            turn_center_command = 4
+            angle_to_center = 360 - angle_to_center
+        else:
+            turn_center_command = 3
 
         # make right turn to north if left turn > 180
-        turn_north_command, center_heading = get_turn(center_heading)
-
-        # turn to center
-        self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', robot.port_id, 'movement', {
-            'command': turn_center_command,
-            'magnitude': abs(round(angle_to_center)),
-            'message': 'Turn to center'
-        }))
-        robot.queued_commands += 1
+        center_heading = center_heading % 360
+        if center_heading > 180:
+            turn_north_command = 4
+            center_heading = 360 - center_heading
+        else:
+            turn_north_command = 3
+
+        # turn to center; a dropped command never produces a move-result, so
+        # each one only counts against the robot when it was actually queued
+        if self.put_bounded(self.connections['COM_LEVEL'][1],
+                            Message('MOV_LEVEL', robot.port_id, 'movement', {
+                                'command': turn_center_command,
+                                'magnitude': abs(round(angle_to_center)),
+                                'message': 'Turn to center'
+                            })):
+            self.adjust_queued_commands(robot, 1)
 
         # move to center
-        self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', robot.port_id, 'movement', {
-            'command': 1,
-            'magnitude': abs(int(distance_to_center)),
-            'message': 'Move to center'
-        }))
-        robot.queued_commands += 1
+        if self.put_bounded(self.connections['COM_LEVEL'][1],
+                            Message('MOV_LEVEL', robot.port_id, 'movement', {
+                                'command': 1,
+                                'magnitude': abs(int(distance_to_center)),
+                                'message': 'Move to center'
+                            })):
+            self.adjust_queued_commands(robot, 1)
 
         # face north
-        self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', robot.port_id, 'movement', {
-            'command': turn_north_command,
-            'magnitude': abs(round(center_heading)),
-            'message': 'Turn to center'
-        }))
-        robot.queued_commands += 1
+        if self.put_bounded(self.connections['COM_LEVEL'][1],
+                            Message('MOV_LEVEL', robot.port_id, 'movement', {
+                                'command': turn_north_command,
+                                'magnitude': abs(round(center_heading)),
+                                'message': 'Turn to center'
+                            })):
+            self.adjust_queued_commands(robot, 1)
 
     def process_plan(self, actions):
         """
@@ -518,11 +696,8 @@ class MovementLevel:
             command = action[0]
 
             # convert robot number to port_id
-            for robot_port_id, robot in self.robots.items():
-                if robot.robot_number == action[1]:
-                    port_id = robot_port_id
-                    robot_obj = robot
-                    break
+            robot_obj = self.robots_by_number[action[1]]
+            port_id = robot_obj.port_id
 
             # get destination angle
             if command == "moveUp":
@@ -537,26 +712,34 @@ class MovementLevel:
             # turn to destination
             turn_magnitude = robot_obj.heading - turn_dest
 
-            # make right turn center if left turn > 180
-            turn_command, turn_magnitude = get_turn(turn_magnitude)
+            # make right turn center if left turn > 180 (command 4 is a
+            # right turn)
+            turn_magnitude = turn_magnitude % 360
+            if turn_magnitude > 180:
+                turn_command = 4
+                turn_magnitude = 360 - turn_magnitude
+            else:
+                turn_command = 3
 
-            self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', port_id, 'movement', {
-                'command': turn_command,
-                'magnitude': abs(round(turn_magnitude)),
-                'message': 'Turn to destination'
-            }))
-            self.robots[port_id].queued_commands += 1
+            if self.put_bounded(self.connections['COM_LEVEL'][1],
+                                Message('MOV_LEVEL', port_id, 'movement', {
+                                    'command': turn_command,
+                                    'magnitude': abs(round(turn_magnitude)),
+                                    'message': 'Turn to destination'
+                                })):
+                self.adjust_queued_commands(robot_obj, 1)
 
             # get destination distance
             distance = int(self.world_model.cm_per_tile)
 
             # move to destination
-            self.connections['COM_LEVEL'][1].put(Message('MOV_LEVEL', port_id, 'movement', {
-                'command': 1,
-                'magnitude': distance,
-                'message': 'Move to destination'
-            }))
-            self.robots[port_id].queued_commands += 1
+            if self.put_bounded(self.connections['COM_LEVEL'][1],
+                                Message('MOV_LEVEL', port_id, 'movement', {
+                                    'command': 1,
+                                    'magnitude': distance,
+                                    'message': 'Move to destination'
+                                })):
+                self.adjust_queued_commands(robot_obj, 1)
 
             # update robot heading
             robot_obj.heading = turn_dest
@@ -570,114 +753,204 @@ class MovementLevel:
             robot (Robot): The robot to update
         """
 
+        # if the new position still quantizes into the cached tile, the grid
+        # is already correct and the tile lookups can be skipped entirely
+        cached = self.robot_tiles.get(robot.robot_number)
+        if (cached is not None and cached.occupied is robot and
+                self.world_model.in_bounds_real_coords(robot.position)):
+            cm_per_tile = self.world_model.cm_per_tile
+            if cached.position == (int(robot.position[0] / cm_per_tile),
+                                   int(robot.position[1] / cm_per_tile)):
+                # a same-tile update is still a successful tile lookup
+                self.scramble_robots = 0
+                return
+
         # find the old and new tiles for the robot
-        old_tile = self.world_model.find_tile(robot)
+        old_tile = self.find_tile(robot)
         new_tile = self.world_model.get_tile_real_coords(robot.position)
 
         # if a new tile can't be found, don't update the tile
         if new_tile is None:
             self.connections["MAIN_LEVEL"][1].put(Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
-                'message': 'Could not find a tile for ' + robot.robot_id
+                'message': f'Could not find a tile for {robot.robot_id}'
             }))
-            self.scramble_robots += 1
+            # clamp at the trigger threshold so persistent failures can't
+            # grow the counter without bound
+            self.scramble_robots = min(self.scramble_robots + 1, 5)
             return
         else:
-            self.Scramble = 0
+            self.scramble_robots = 0
         # if old and new tile are the same, don't update anything
         if new_tile == old_tile:
             return
 
         # if robot has moved, update the new tile to hold the robot
         new_tile.occupied = robot
+        self.robot_tiles[robot.robot_number] = new_tile
 
         # if robot has an old tile (hasn't just been added), set it to be unoccupied again
         if old_tile is not None:
             old_tile.occupied = None
 
-    def get_robot(self, robot_id):
+        # publish both cell writes to the shared grid as one versioned update
+        self.world_model.record_move(old_tile, new_tile, robot.robot_number)
+
+    def put_bounded(self, queue_obj, message):
         """
-        Get the robot associated with the given robot id
+        Puts a message on a bounded inter-level queue, waiting briefly if it is full.  If
+        the consumer still hasn't drained the queue after the wait, the message is dropped
+        and the drop is reported to the main level, so backpressure degrades into lost
+        messages instead of unbounded memory growth.  Returns whether the message was
+        actually queued, so callers can skip bookkeeping that assumes delivery.
 
         Args:
-            robot_id (int): the robot id to search for
+            queue_obj (Queue): The queue to put the message on.
+            message (Message): The message to send.
         """
 
-        for port_id, robot in self.robots.items():
-            if robot_id == robot.robot_id:
-                return robot
-        return None
-# End class MovementLevel
+        try:
+            queue_obj.put(message, timeout=0.1)
+            return True
+        except Full:
+            # The report must not block either; if main's queue is also full
+            # the drop goes unreported rather than stalling the event loop
+            try:
+                self.connections["MAIN_LEVEL"][1].put_nowait(
+                    Message('MOV_LEVEL', 'MAIN_LEVEL', 'error', {
+                        'message': f'Dropped a message to {message.destination}; '
+                                   'the queue is full'
+                    }))
+            except Full:
+                pass
+            return False
 
-def get_distance(old_position, new_position):
-    """
-    Returns the Pythagorean distance between two points.
+    def register_robot(self, robot):
+        """
+        Adds a robot to the port map and to the id/number indexes.  A robot already
+        registered on the same port is retired first so its counter contributions
+        don't outlive it.
 
-    Args:
-        old_position (Tuple): first position, in the form (row, col)
-        new_position (Tuple): second position, in the form (row, col)
-    """
+        Args:
+            robot (Robot): The robot to register.
+        """
 
-    return math.sqrt((new_position[0] - old_position[0]) ** 2 +
-                     (new_position[1] - old_position[1]) ** 2)
+        displaced = self.robots.get(robot.port_id)
+        if displaced is not None:
+            self.set_connection_error(displaced, False)
+            self.adjust_queued_commands(displaced, -displaced.queued_commands)
+            self.robots_by_id.pop(displaced.robot_id, None)
+            self.robots_by_number.pop(displaced.robot_number, None)
+            self.robot_tiles.pop(displaced.robot_number, None)
 
-def get_angle(old_position, new_position):
-    """
-    Calculates the absolute angle between two points, relative to north.
-    For example, get_angle((0, 0), (0, -1)) would return 270 degrees,
-    the angle from north the line intersecting the two positions forms.
+        self.robots[robot.port_id] = robot
+        if robot.robot_id is not None:
+            self.robots_by_id[robot.robot_id] = robot
+        self.robots_by_number[robot.robot_number] = robot
 
-    Args:
-        old_position (Tuple): first position, treated as the center coordinate,
-        in the form (row, col)
-        new_position (Tuple): second position, towards which the intersecting line
-        is calculated, in the form (row, col)
-    """
+    def register_sensor(self, sensor):
+        """
+        Adds a sensor to the sensor map and seeds the health counters for it.  A sensor
+        already registered on the same port is retired first so its counter contributions
+        don't outlive it.
 
-    # calculate slope of line between old and new positions
-    rise = (new_position[1] - old_position[1])
-    run = (new_position[0] - old_position[0])
+        Args:
+            sensor (Sensor): The sensor to register.
+        """
 
-    # calculate angle between line and x-axis
-    inner_angle = math.degrees(math.atan(float(rise) / run))
+        displaced = self.sensors.get(sensor.port_id)
+        if displaced is not None:
+            self.set_connection_error(displaced, False)
+            self.mark_received(displaced, True)
+            self.unasked_sensors.discard(displaced)
+            if self.camera_sensor is displaced:
+                self.camera_sensor = None
+
+        self.sensors[sensor.port_id] = sensor
+        if sensor.sensor_type == 'camera':
+            self.camera_sensor = sensor
+        self.unreceived_sensors += 1
+        self.unasked_sensors.add(sensor)
+
+    def set_connection_error(self, device, value):
+        """
+        Sets the connection error flag on a robot or sensor and keeps the errored device
+        counter in sync.
 
-    # get angle to the north based on quadrant
-    if run < 0:
-        return inner_angle + 270
-    else:
-        return inner_angle + 90
+        Args:
+            device (Robot/Sensor): The device whose flag to set.
+            value (bool): The new value of the connection error flag.
+        """
 
-def switch_turn(old_turn):
-    """
-    Switchs from a left turn to a right turn and vis versa
+        if device.connection_error != value:
+            device.connection_error = value
+            self.errored_devices += 1 if value else -1
 
-    Args:
-        old_turn (int): the turn to switch (3 = left, 4 = right)
-    """
+    def adjust_queued_commands(self, robot, delta):
+        """
+        Changes the number of commands queued on a robot and keeps the in-flight command
+        counter in sync.
 
-    if old_turn == 3:
-        return 4
-    else:
-        return 3
+        Args:
+            robot (Robot): The robot whose queue to adjust.
+            delta (int): The change in the number of queued commands.
+        """
 
-def get_turn(turn_magnitude):
-    """
-    Determine whether the robot should make a left or right turn depending on the
-    turn magnitude it must make.
+        robot.queued_commands += delta
+        self.pending_commands += delta
 
-    Args:
-        turn_magnitude (double): the magnitude of the turn
-    """
+    def mark_received(self, sensor, value):
+        """
+        Sets the received flag on a sensor and keeps the unreceived sensor counter in sync.
 
-    # By default, the robot turns left because all angles are from true north (0 to 359)
-    turn_command = 3
+        Args:
+            sensor (Sensor): The sensor whose flag to set.
+            value (bool): The new value of the received flag.
+        """
 
-    # make right turn if left turn > 180
-    if turn_magnitude < 0:
-        turn_magnitude = abs(turn_magnitude)
-        turn_command = switch_turn(turn_command)
+        if sensor.received != value:
+            sensor.received = value
+            self.unreceived_sensors += -1 if value else 1
 
-    if turn_magnitude > 180:
-        turn_magnitude = 360 - turn_magnitude
-        turn_command = switch_turn(turn_command)
+    def mark_asked(self, sensor, value):
+        """
+        Sets the asked flag on a sensor and keeps the unasked sensor set in sync.
 
-    return turn_command, turn_magnitude
+        Args:
+            sensor (Sensor): The sensor whose flag to set.
+            value (bool): The new value of the asked flag.
+        """
+
+        sensor.asked = value
+        if value:
+            self.unasked_sensors.discard(sensor)
+        else:
+            self.unasked_sensors.add(sensor)
+
+    def get_robot(self, robot_id):
+        """
+        Get the robot associated with the given robot id
+
+        Args:
+            robot_id (int): the robot id to search for
+        """
+
+        return self.robots_by_id.get(robot_id)
+
+    def find_tile(self, robot):
+        """
+        Finds the tile containing the given robot.  The cached tile is used when it is still
+        occupied by the robot; otherwise the world model grid is searched and the cache is
+        refreshed.
+
+        Args:
+            robot (Robot): The robot whose tile to find.
+        """
+
+        tile = self.robot_tiles.get(robot.robot_number)
+        if tile is not None and tile.occupied is robot:
+            return tile
+
+        tile = self.world_model.find_tile(robot)
+        self.robot_tiles[robot.robot_number] = tile
+        return tile
+# End class MovementLevel
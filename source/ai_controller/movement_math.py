@@ -0,0 +1,58 @@
+'''
+This file is part of the amoebots project developed under the IPFW Senior Design Capstone.
+
+Created on Apr 22, 2017
+
+View the full repository here https://github.com/car-chase/amoebots
+'''
+
+import math
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional; without it the geometry runs as plain Python
+    def njit(*args, **kwargs):
+        """
+        Stand-in for numba.njit that returns the function unchanged.
+        """
+        def wrap(func):
+            return func
+        if args and callable(args[0]):
+            return args[0]
+        return wrap
+
+@njit(cache=True)
+def get_distance(old_x, old_y, new_x, new_y):
+    """
+    Returns the Pythagorean distance between two points.  The coordinates are passed as
+    scalars so the compiled code works on machine floats rather than Python tuples.
+
+    Args:
+        old_x (double): x coordinate of the first position
+        old_y (double): y coordinate of the first position
+        new_x (double): x coordinate of the second position
+        new_y (double): y coordinate of the second position
+    """
+
+    return math.hypot(new_x - old_x, new_y - old_y)
+
+@njit(cache=True)
+def get_angle(old_x, old_y, new_x, new_y):
+    """
+    Calculates the absolute angle between two points, relative to north.
+    For example, get_angle(0, 0, 0, -1) would return 0 degrees,
+    the angle from north the line intersecting the two positions forms.
+
+    Args:
+        old_x (double): x coordinate of the first position, treated as the center coordinate
+        old_y (double): y coordinate of the first position
+        new_x (double): x coordinate of the second position, towards which the
+        intersecting line is calculated
+        new_y (double): y coordinate of the second position
+    """
+
+    # atan2 resolves the quadrant directly and handles a vertical line, where
+    # the old slope-based formula divided by zero
+    return (math.degrees(math.atan2(new_y - old_y, new_x - old_x)) + 90) % 360
+
@@ -16,12 +16,12 @@ class Pathfinder:
     commands for the robot to execute.
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         world_grid (Tile[][]) The 2D array containing the current state of the world.
         robot_goal_positions (tuple[]) An array of tuples mapping robots to their goal positions.
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         init_row (list): The list containing all the row numbers.
         init_col (list): The list containing all the column numbers.
         init_state (list): The list containing the current state of the world in PDDL.
@@ -42,7 +42,7 @@ class Pathfinder:
             active_robots.append(robot[0])
 
         # Parse the world to generate the initial state
-        self.generate_init_state(self.options["ARENA_SIZE"], world_grid, active_robots)
+        self.generate_init_state(self.options.ARENA_SIZE, world_grid, active_robots)
 
         # Parse the goal positions to generate a goal state
         self.generate_goal_state(robot_goal_positions)
@@ -8,7 +8,10 @@ View the full repository here https://github.com/car-chase/amoebots
 
 import sys
 import socketserver
+import selectors
 import json
+from queue import Empty
+from helpers import get_listener_ip
 from message import Message
 
 class TCPListener:
@@ -23,10 +26,10 @@ class TCPListener:
     b'{\"type\": \"SMORES\",\"ip\": \"192.168.1.1\"}'
 
     Args:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
 
     Attributes:
-        options (dict): The dictionary containing the program settings.
+        options (Options): The named tuple containing the program settings.
         static_com_input (Queue): Static value. Queue for pushing commands from the TCPHandler
         static_next_port (int): Static value. The next available port for a TCP robot to use.
         listener_input (Queue): The queue for receiving messages in the listener level.
@@ -45,7 +48,7 @@ class TCPListener:
         self.listener_input = None
         self.com_input = None
         self.keep_running = True
-        TCPListener.static_next_port = self.options["TCP_LISTENER_START_PORT"]
+        TCPListener.static_next_port = self.options.TCP_LISTENER_START_PORT
 
     def tcp_listener_main(self, listener_input, com_input):
         """
@@ -66,18 +69,31 @@ class TCPListener:
             'message': 'TCP_LISTENER is running'
         }))
 
-        # Create the server, binding the localhost to the assigned port.
+        # Create the server, binding the localhost to the assigned port.  The listener IP is
+        # resolved here, on first use, instead of at import time.
+        listener_ip = self.options.TCP_LISTENER_IP
+        if listener_ip is None:
+            listener_ip = get_listener_ip()
+
         server = socketserver.TCPServer(
-            (self.options["TCP_LISTENER_IP"], self.options["TCP_LISTENER_PORT"]),
+            (listener_ip, self.options.TCP_LISTENER_PORT),
             TCPListener.TCPHandler
         )
         server.socket.settimeout(1)
 
+        # Watch the listening socket for readiness (epoll on Linux) so requests
+        # are only handled when a connection is actually waiting, instead of
+        # blocking in accept on a one second timeout.
+        selector = selectors.DefaultSelector()
+        selector.register(server.socket, selectors.EVENT_READ)
+
         # Enter the main event loop
         while self.keep_running:
-            while not self.listener_input.empty():
-
-                message = self.listener_input.get()
+            while True:
+                try:
+                    message = self.listener_input.get_nowait()
+                except Empty:
+                    break
 
                 # Appropriately process the message depending on its category
                 if isinstance(message, Message) and message.category == 'command':
@@ -87,7 +103,10 @@ class TCPListener:
                     # Echo back the message if it doesn't know what to do
                     self.com_input.put(message)
 
-            server.handle_request()
+            # Wait for a connection; the timeout bounds how long a shutdown
+            # command can sit unread in the listener queue
+            if selector.select(timeout=1):
+                server.handle_request()
 
     def process_command(self, message):
         """
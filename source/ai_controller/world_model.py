@@ -6,6 +6,9 @@ Created on Oct 11, 2016
 View the full repository here https://github.com/car-chase/amoebots
 '''
 
+from multiprocessing import shared_memory
+import numpy as np
+
 class Arena:
     """
     The world model representation of the webots arena. The purpose of the world model
@@ -42,6 +45,42 @@ class Arena:
         for goal in goal_positions:
             self.grid[goal[1]][goal[0]].goal = True
 
+        # The static tile geometry mirrored into arrays: a single indexed
+        # load replaces the tile-object attribute walk, and the arrays can
+        # back vectorized checks over every tile at once
+        self.centers = np.empty((self.height, self.width, 2), dtype=np.float32)
+        self.goal_flags = np.zeros((self.height, self.width), dtype=bool)
+        for row_num, row in enumerate(self.grid):
+            for col, tile in enumerate(row):
+                self.centers[row_num, col] = tile.center
+                self.goal_flags[row_num, col] = tile.goal
+
+        # Shared-memory mirror of the grid; allocated on demand by the
+        # process that owns the world model
+        self.shm = None
+        self.shared_grid = None
+        self.shared_version = None
+
+    def center_of(self, col, row):
+        """
+        Returns the real cm coordinates of a tile's center from the precomputed array.
+
+        Args:
+            col (int): The tile's horizontal position in the world model grid
+            row (int): The tile's vertical position in the world model grid
+        """
+        return self.centers[row, col]
+
+    def is_goal(self, col, row):
+        """
+        Returns whether a tile is a goal from the precomputed array.
+
+        Args:
+            col (int): The tile's horizontal position in the world model grid
+            row (int): The tile's vertical position in the world model grid
+        """
+        return self.goal_flags[row, col]
+
     def in_bounds(self, position):
         """
         Determine if a position is in or out of bounds
@@ -118,6 +157,150 @@ class Arena:
                     return tile
         return None
 
+    def init_shared_state(self):
+        """
+        Allocates a shared-memory mirror of the grid so other processes can read the world
+        state directly instead of receiving a serialized copy through a queue.  The segment
+        starts with an int64 version counter used as a seqlock: it is bumped to an odd value
+        before an occupancy update and back to even after, so readers can tell both when a
+        write is in flight and when one raced their snapshot.  The grid follows, with
+        channel 0 of each cell holding the occupant robot number (-1 for empty) and
+        channel 1 the goal flag.
+
+        Must be called in the process that owns the world model.
+        """
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=8 + self.width * self.height * 2)
+        self.shared_version = np.ndarray((), dtype=np.int64, buffer=self.shm.buf)
+        self.shared_grid = np.ndarray((self.height, self.width, 2), dtype=np.int8,
+                                      buffer=self.shm.buf, offset=8)
+
+        self.shared_version[...] = 0
+
+        self.shared_grid[:, :, 0] = -1
+        for row_num, row in enumerate(self.grid):
+            for col, tile in enumerate(row):
+                self.shared_grid[row_num, col, 1] = 1 if tile.goal else 0
+                if tile.occupied is not None:
+                    self.shared_grid[row_num, col, 0] = tile.occupied.robot_number
+
+    def record_move(self, old_tile, new_tile, robot_number):
+        """
+        Mirrors a robot moving between tiles into the shared grid, if it has been
+        allocated.  Both cell writes happen under one version bump pair (odd while
+        writing, even when done), so a reader can never capture a stable snapshot with
+        the robot on two tiles at once.
+
+        Args:
+            old_tile (Tile): The tile the robot left (None if it was just added).
+            new_tile (Tile): The tile the robot now occupies.
+            robot_number (int): The robot number of the robot that moved.
+        """
+        if self.shared_grid is None:
+            return
+
+        self.shared_version += 1
+
+        new_col, new_row = new_tile.position
+        self.shared_grid[new_row, new_col, 0] = robot_number
+        if old_tile is not None:
+            old_col, old_row = old_tile.position
+            self.shared_grid[old_row, old_col, 0] = -1
+
+        self.shared_version += 1
+
+    def close_shared_state(self):
+        """
+        Releases and unlinks the shared-memory mirror.
+        """
+        if self.shm is not None:
+            self.shared_grid = None
+            self.shared_version = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    @classmethod
+    def from_shared_buffer(cls, buf, arena_size, arena_size_cm):
+        """
+        Rebuilds an arena by reading another process's shared-memory mirror.  As with plan
+        payloads, the occupants are restored as PlanRobot stand-ins.
+
+        Args:
+            buf (memoryview): The buffer of the attached SharedMemory block.
+            arena_size (int): The size of the arena in tiles.
+            arena_size_cm (double): The physical size of the arena in cm.
+        """
+        version = np.ndarray((), dtype=np.int64, buffer=buf)
+        grid_view = np.ndarray((arena_size, arena_size, 2), dtype=np.int8, buffer=buf,
+                               offset=8)
+
+        # Seqlock read: the writer holds the version odd while an update is
+        # in flight, so retry while the version is odd or changed under the
+        # copy; a stable snapshot can't show a robot halfway between tiles
+        while True:
+            version_before = int(version)
+            if version_before % 2:
+                continue
+            shared_grid = grid_view.copy()
+            if int(version) == version_before:
+                break
+
+        goals = []
+        occupants = []
+        for row in range(arena_size):
+            for col in range(arena_size):
+                if shared_grid[row, col, 1]:
+                    goals.append((col, row))
+                if shared_grid[row, col, 0] >= 0:
+                    occupants.append((int(shared_grid[row, col, 0]), col, row))
+
+        arena = cls(arena_size, arena_size_cm, goals)
+        for robot_number, col, row in occupants:
+            arena.grid[row][col].occupied = PlanRobot(robot_number)
+
+        return arena
+
+    def to_plan_payload(self):
+        """
+        Serializes the parts of the world model the AI level needs for planning into a dict of
+        primitives.  Only the arena dimensions, goal positions, and occupant robot numbers are
+        kept, which is far smaller and faster to encode than pickling the full object graph.
+        """
+        goals = []
+        robots = []
+        for row in self.grid:
+            for tile in row:
+                if tile.goal:
+                    goals.append(tile.position)
+                if tile.occupied is not None:
+                    robots.append((tile.occupied.robot_number,
+                                   tile.position[0], tile.position[1]))
+
+        return {
+            'arena_size': self.width,
+            'arena_size_cm': self.width_cm,
+            'goals': goals,
+            'robots': robots,
+        }
+
+    @classmethod
+    def from_plan_payload(cls, payload):
+        """
+        Rebuilds an arena from a plan payload.  The occupants are restored as PlanRobot
+        stand-ins, which carry only the robot number the planner reads.
+
+        Args:
+            payload (dict): The dict produced by to_plan_payload.
+        """
+        arena = cls(payload['arena_size'], payload['arena_size_cm'],
+                    [tuple(goal) for goal in payload['goals']])
+
+        for robot_number, col, row in payload['robots']:
+            arena.grid[row][col].occupied = PlanRobot(robot_number)
+
+        return arena
+
     def to_string(self):
         """
         Generates the state of the world as a string. "o" tiles are open, "g" tiles are goals,
@@ -138,6 +321,20 @@ class Arena:
 
         return line
 
+class PlanRobot:
+    """
+    Lightweight stand-in for a Robot used when a world model is rebuilt from a plan payload.
+    Only the robot number is carried because that is all the planner reads.
+
+    Args:
+        robot_number (int): The number used to identify the robot
+
+    Attributes:
+        robot_number (int): The number used to identify the robot
+    """
+    def __init__(self, robot_number):
+        self.robot_number = robot_number
+
 class Robot:
     """
     Representation of a robot in the world model. Each robot has a real position and heading,